@@ -7,13 +7,27 @@ Automates batch processing of casino promotion JSONs through Ren3 AI Agent
 import os
 import sys
 import json
+import gzip
 import time
 import uuid
+import random
 import logging
+import threading
 import requests
-import pandas as pd
+from contextlib import ExitStack
+import pyarrow as pa
+import pyarrow.csv as pv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+
+try:
+    import polars as pl
+except ImportError:  # Fall back to pyarrow/pandas in combine_csvs
+    pl = None
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 # Configure logging
@@ -27,6 +41,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# HTTP statuses that indicate a bad request/config rather than a transient failure
+UNRECOVERABLE_STATUS_CODES = {400, 401, 403, 404, 422}
+
+# Reconnects to the log stream without any new event before falling back to polling
+STREAM_MAX_IDLE_RECONNECTS = 3
+
+# JSON bodies larger than this are sent gzip-compressed
+GZIP_MIN_BYTES = 1024
+
 
 class Ren3Config:
     """Configuration for Ren3 API"""
@@ -38,12 +61,92 @@ class Ren3Config:
         self.agent_folder = os.getenv('REN3_AGENT_FOLDER')
         self.poll_interval = int(os.getenv('POLL_INTERVAL', '15'))
         self.max_retries = int(os.getenv('MAX_RETRIES', '3'))
+        self.poll_min = float(os.getenv('REN3_POLL_MIN', '1.0'))
+        self.poll_max = float(os.getenv('REN3_POLL_MAX', str(self.poll_interval)))
+        # Jitter above 1 would allow negative sleeps
+        self.poll_jitter = min(1.0, max(0.0, float(os.getenv('REN3_POLL_JITTER', '0.5'))))
+        self.max_parallel_files = max(1, int(os.getenv('MAX_PARALLEL_FILES', '1')))
+        self.rate_limit = float(os.getenv('REN3_RATE_LIMIT', '2'))
+        self.stream_logs = os.getenv('REN3_STREAM_LOGS', 'false').lower() in ('1', 'true', 'yes')
+        self.gzip_requests = os.getenv('REN3_GZIP_REQUESTS', 'true').lower() in ('1', 'true', 'yes')
+        self.result_csv_name = os.getenv('REN3_RESULT_CSV', 'competitive_analysis_results.csv')
         
         # Validate required config
         required = ['user_id', 'workspace_id', 'agent_uuid', 'agent_folder']
         missing = [k for k in required if not getattr(self, k)]
         if missing:
             raise ValueError(f"Missing required config: {', '.join(missing)}")
+        
+        if self.poll_min <= 0:
+            raise ValueError(f"REN3_POLL_MIN must be positive, got {self.poll_min}")
+
+
+class PrefixLogAdapter(logging.LoggerAdapter):
+    """Prefixes messages so output from concurrent workers can be told apart"""
+    def process(self, msg, kwargs):
+        return f"[{self.extra['prefix']}] {msg}", kwargs
+
+
+class RateLimiter:
+    """Spaces out API requests across threads and honours server back-off"""
+    def __init__(self, rate: float):
+        # rate is requests per second; 0 disables spacing
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+    
+    def acquire(self):
+        """Block until the next request slot is available"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_time)
+            self._next_time = slot + self.interval
+        
+        if slot > now:
+            time.sleep(slot - now)
+    
+    def pause(self, seconds: float):
+        """Hold off all requests for the given number of seconds"""
+        with self._lock:
+            self._next_time = max(self._next_time, time.monotonic() + seconds)
+
+
+class LazyFile:
+    """Read-only file body that is only open while it is being streamed"""
+    def __init__(self, path: Path):
+        self.path = path
+        self._size = os.path.getsize(path)
+        self._pos = 0
+        self._fh = None
+    
+    @property
+    def len(self) -> int:
+        """Bytes left to read (used by MultipartEncoder)"""
+        return self._size - self._pos
+    
+    def read(self, size: int = -1) -> bytes:
+        if self._fh is None:
+            self._fh = open(self.path, 'rb')
+        
+        chunk = self._fh.read(size)
+        self._pos += len(chunk)
+        
+        if not chunk or self._pos >= self._size:
+            # Done (or file shrank) - release the handle right away
+            self._pos = self._size
+            self.close()
+        return chunk
+    
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
 
 
 class Ren3AgentProcessor:
@@ -52,13 +155,31 @@ class Ren3AgentProcessor:
     def __init__(self, config: Ren3Config):
         self.config = config
         self.session = requests.Session()
+        
+        # Keep a warm connection pool shared by all workers; retries are
+        # handled in _api_call, not by urllib3
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                              max_retries=Retry(total=0))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'en-US,en;q=0.9',
             'Origin': 'https://ren3.ai',
-            'Referer': 'https://ren3.ai/'
+            'Referer': 'https://ren3.ai/',
+            'Connection': 'keep-alive'
         })
+        
+        # Shared by all workers in place of fixed per-file sleeps
+        self._rate_limiter = RateLimiter(config.rate_limit)
+        
+        # Turned off for the rest of the run if the log stream proves unusable
+        self._stream_logs = config.stream_logs
+        
+        # Turned off for the rest of the run if the server rejects gzip bodies
+        self._gzip_requests = config.gzip_requests
     
     def _api_call(self, endpoint: str, data: dict, files: dict = None, 
                   method: str = 'POST') -> dict:
@@ -66,13 +187,14 @@ class Ren3AgentProcessor:
         url = f"{self.config.api_url}{endpoint}"
         
         for attempt in range(self.config.max_retries):
+            self._rate_limiter.acquire()
             try:
                 if files:
                     # For file uploads, don't send JSON
                     response = self.session.post(url, data=data, files=files, timeout=300)
                 else:
                     if method == 'POST':
-                        response = self.session.post(url, json=data, timeout=60)
+                        response = self._post_json(url, data)
                     else:
                         response = self.session.get(url, params=data, timeout=60)
                 
@@ -80,23 +202,82 @@ class Ren3AgentProcessor:
                 return response.json()
                 
             except requests.exceptions.RequestException as e:
+                # Client errors will not succeed on retry - fail fast
+                status = e.response.status_code if e.response is not None else None
+                if status in UNRECOVERABLE_STATUS_CODES:
+                    logger.error(f"API call failed with unrecoverable status {status}: {e}")
+                    raise
+                
                 logger.warning(f"API call failed (attempt {attempt + 1}/{self.config.max_retries}): {e}")
+                
+                retry_after = self._retry_after(e.response)
+                if retry_after is not None:
+                    # Server told us when to come back - applies to all workers
+                    logger.info(f"Rate limited - backing off {retry_after:.0f} seconds")
+                    self._rate_limiter.pause(retry_after)
+                
                 if attempt < self.config.max_retries - 1:
-                    time.sleep(5 * (attempt + 1))  # Exponential backoff
+                    # Exponential backoff with full jitter so workers don't retry in lockstep
+                    delay = min(30, 1.0 * (2 ** attempt))
+                    time.sleep(random.uniform(0, delay))
                 else:
                     raise
     
+    def _post_json(self, url: str, data: dict) -> requests.Response:
+        """POST a JSON body, resending it uncompressed if the server rejects gzip"""
+        body, headers = self._encode_json(data, compress=self._gzip_requests)
+        response = self.session.post(url, data=body, headers=headers, timeout=60)
+        
+        if 'Content-Encoding' in headers and response.status_code in (400, 415):
+            logger.warning(f"Server rejected gzip request body (HTTP {response.status_code}) "
+                           f"- disabling request compression")
+            self._gzip_requests = False
+            body, headers = self._encode_json(data, compress=False)
+            response = self.session.post(url, data=body, headers=headers, timeout=60)
+        
+        return response
+    
+    def _encode_json(self, data: dict, compress: bool = True) -> Tuple[bytes, Dict[str, str]]:
+        """Serialize a JSON body, gzip-compressing it when large"""
+        body = json.dumps(data).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        
+        if compress and len(body) > GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        
+        return body, headers
+    
+    def _retry_after(self, response: Optional[requests.Response]) -> Optional[float]:
+        """Seconds to wait from a 429 response's Retry-After header, if any"""
+        if response is None or response.status_code != 429:
+            return None
+        
+        try:
+            return max(0.0, float(response.headers.get('Retry-After', '')))
+        except ValueError:
+            return None
+    
+    def _poll_delay(self, poll_iter: int) -> float:
+        """Exponential backoff delay for the given poll iteration, with jitter"""
+        # Clamp the exponent so long quiet jobs can't overflow the float
+        delay = min(self.config.poll_max, self.config.poll_min * (2 ** min(poll_iter, 32)))
+        jitter = self.config.poll_jitter
+        return random.uniform((1 - jitter) * delay, (1 + jitter) * delay)
+    
     def get_json_files(self, promo_folder: Path) -> List[Path]:
         """Get all JSON files except special files"""
-        json_files = []
-        for file in promo_folder.glob("*.json"):
-            # Skip special files
-            if file.name.startswith('_'):
-                continue
-            json_files.append(file)
+        # scandir reuses the directory entry's type, avoiding a stat per file
+        with os.scandir(promo_folder) as entries:
+            json_files = [
+                Path(entry.path) for entry in entries
+                # Skip special files
+                if entry.name.endswith('.json') and not entry.name.startswith('_')
+                and entry.is_file()
+            ]
         
         # Sort by filename for consistent ordering
-        json_files.sort()
+        json_files.sort(key=lambda p: p.name)
         logger.info(f"Found {len(json_files)} JSON files to process")
         return json_files
 
@@ -104,65 +285,59 @@ class Ren3AgentProcessor:
         """Upload batch of JSON files to Ren3"""
         logger.info(f"Uploading {len(batch)} files...")
         
-        # Prepare files list (don't use files parameter in _api_call)
-        files = []
-        for json_file in batch:
-            files.append(('file', (json_file.name, open(json_file, 'rb'), 'application/json')))
-        
         # Prepare form data
-        form_data = {
-            'workspaceid': self.config.workspace_id,
-            'useruuid': self.config.user_id,
-            'uploadtype': 'agents',
-            'fileignoreparent': 'false',
-            'parentfolder': temp_folder_uuid,
-            'forceOverwrite': 'true',
-            'tempfolderuuid': temp_folder_uuid,
-            'agentuuid': self.config.agent_uuid,
-            'agent_folder': self.config.agent_folder,
-            'extra': json.dumps({
+        form_data = [
+            ('workspaceid', self.config.workspace_id),
+            ('useruuid', self.config.user_id),
+            ('uploadtype', 'agents'),
+            ('fileignoreparent', 'false'),
+            ('parentfolder', temp_folder_uuid),
+            ('forceOverwrite', 'true'),
+            ('tempfolderuuid', temp_folder_uuid),
+            ('agentuuid', self.config.agent_uuid),
+            ('agent_folder', self.config.agent_folder),
+            ('extra', json.dumps({
                 'tempfolderuuid': temp_folder_uuid,
                 'agentuuid': self.config.agent_uuid,
                 'agent_folder': self.config.agent_folder
-            })
-        }
+            }))
+        ]
         
         url = f"{self.config.api_url}/upload_agenttmpfiles"
         
-        try:
-            # Make direct request without using _api_call
-            response = self.session.post(url, data=form_data, files=files, timeout=300)
+        # Files are opened one at a time as the body streams; any handle still
+        # open is closed on success or error when the stack exits
+        self._rate_limiter.acquire()
+        with ExitStack() as stack:
+            for json_file in batch:
+                file_obj = stack.enter_context(LazyFile(json_file))
+                form_data.append(('file', (json_file.name, file_obj, 'application/json')))
             
-            # Close all file handles
-            for _, (_, file_obj, _) in files:
-                file_obj.close()
+            # Stream the multipart body from disk instead of building it in memory
+            encoder = MultipartEncoder(fields=form_data)
             
-            # Log response for debugging
-            logger.info(f"Upload response status: {response.status_code}")
-            if response.status_code != 200:
-                logger.error(f"Upload response: {response.text[:500]}")
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('success'):
-                logger.info(f"Uploaded {len(batch)} files successfully")
-                return result
-            else:
-                raise Exception(f"Upload failed: {result}")
-                
-        except Exception as e:
-            # Close file handles on error
-            for _, (_, file_obj, _) in files:
-                try:
-                    file_obj.close()
-                except:
-                    pass
-            raise
+            # Make direct request without using _api_call
+            response = self.session.post(url, data=encoder,
+                                         headers={'Content-Type': encoder.content_type},
+                                         timeout=300)
+        
+        # Log response for debugging
+        logger.info(f"Upload response status: {response.status_code}")
+        if response.status_code != 200:
+            logger.error(f"Upload response: {response.text[:500]}")
+        
+        response.raise_for_status()
+        result = response.json()
+        
+        if result.get('success'):
+            logger.info(f"Uploaded {len(batch)} files successfully")
+            return result
+        else:
+            raise Exception(f"Upload failed: {result}")
     
     def get_job_input_files(self, temp_folder_uuid: str) -> List[Dict]:
         """Get list of uploaded files from temp folder"""
-        logger.info("Verifying uploaded files...")
+        logger.debug("Verifying uploaded files...")
         
         data = {
             'input_folder': temp_folder_uuid,
@@ -174,11 +349,31 @@ class Ren3AgentProcessor:
         
         if response.get('success'):
             files = response.get('returnObject', [])
-            logger.info(f"Verified {len(files)} files in temp folder")
+            logger.debug(f"Verified {len(files)} files in temp folder")
             return files
         else:
             raise Exception(f"Failed to get input files: {response}")
     
+    def _wait_for_ingestion(self, temp_folder_uuid: str, expected: int,
+                            timeout: float = 30, base: float = 0.5) -> List[Dict]:
+        """Poll the temp folder until all uploaded files are ingested or timeout"""
+        logger.info("Waiting for file ingestion...")
+        
+        start_time = time.time()
+        files = []
+        
+        while time.time() - start_time < timeout:
+            files = self.get_job_input_files(temp_folder_uuid)
+            if len(files) >= expected:
+                logger.info(f"Verified {len(files)} files in temp folder")
+                return files
+            
+            time.sleep(random.uniform(base, base * 1.5))
+            base = min(5, base * 1.5)
+        
+        raise Exception(f"Ingestion timed out after {timeout:.0f} seconds "
+                        f"({len(files)}/{expected} files)")
+    
     def run_agent(self, input_files: List[Dict], temp_folder_uuid: str) -> str:
         """Run the Ren3 agent on uploaded files"""
         logger.info(f"Running agent on {len(input_files)} files...")
@@ -202,12 +397,14 @@ class Ren3AgentProcessor:
         else:
             raise Exception(f"Failed to run agent: {response}")
     
-    def poll_job_status(self, job_id: str) -> bool:
-        """Poll job status until completion"""
+    def poll_job_status(self, job_id: str) -> Tuple[bool, Optional[str]]:
+        """Poll job status until completion, returning the output folder if logged"""
         logger.info("Waiting for agent to complete...")
         
         start_time = time.time()
-        last_progress = None
+        last_progress_id = None
+        last_idx = 0
+        poll_iter = 0
         
         while True:
             data = {
@@ -222,28 +419,132 @@ class Ren3AgentProcessor:
                 if response.get('success'):
                     logs = response.get('returnObject', [])
                     
-                    # Check for completion
-                    for log in logs:
-                        if log.get('type') == 2:
-                            text = log.get('text', '')
-                            if 'completed' in text.lower():
-                                elapsed = time.time() - start_time
-                                logger.info(f"Agent completed in {elapsed:.0f} seconds")
-                                return True
+                    # Only look at logs added since the last poll, in a single pass
+                    for log in logs[last_idx:]:
+                        text = log.get('text') or ''
+                        text_lower = text.lower()
+                        
+                        # Check for completion
+                        if log.get('type') == 2 and 'completed' in text_lower:
+                            elapsed = time.time() - start_time
+                            logger.info(f"Agent completed in {elapsed:.0f} seconds")
+                            return True, log.get('output_folder')
                         
-                        # Show progress updates
-                        if 'progress' in log.get('text', '').lower():
-                            progress = log.get('text')
-                            if progress != last_progress:
-                                logger.info(f"  Progress: {progress}")
-                                last_progress = progress
+                        # Show progress updates, keyed on the log's own id
+                        progress_id = log.get('uuid', text)
+                        if 'progress' in text_lower and progress_id != last_progress_id:
+                            logger.info(f"  Progress: {text}")
+                            last_progress_id = progress_id
+                            # Job is actively working - poll quickly again
+                            poll_iter = 0
+                    
+                    last_idx = len(logs)
                 
                 # Wait before next poll
-                time.sleep(self.config.poll_interval)
+                time.sleep(self._poll_delay(poll_iter))
+                poll_iter += 1
                 
             except Exception as e:
+                # Bad config/job id won't fix itself - don't poll forever
+                if (isinstance(e, requests.exceptions.HTTPError) and e.response is not None
+                        and e.response.status_code in UNRECOVERABLE_STATUS_CODES):
+                    raise
+                
                 logger.warning(f"Error polling status: {e}")
-                time.sleep(self.config.poll_interval)
+                time.sleep(self._poll_delay(poll_iter))
+                poll_iter += 1
+    
+    def poll_job_status_stream(self, job_id: str) -> Tuple[bool, Optional[str]]:
+        """Wait for job completion on the streamed log endpoint, falling back to polling"""
+        if not self._stream_logs:
+            return self.poll_job_status(job_id)
+        
+        logger.info("Waiting for agent to complete (streaming logs)...")
+        
+        url = f"{self.config.api_url}/agentdrive/stream_agentjoblogs"
+        start_time = time.time()
+        since_log_id = None
+        last_progress_id = None
+        reconnects = 0
+        unsupported = None
+        
+        while reconnects < STREAM_MAX_IDLE_RECONNECTS:
+            params = {
+                'uuid': job_id,
+                'userid': self.config.user_id,
+                'workspaceid': self.config.workspace_id
+            }
+            if since_log_id:
+                # Only receive logs we have not seen yet
+                params['since_log_id'] = since_log_id
+            
+            self._rate_limiter.acquire()
+            try:
+                with self.session.get(url, params=params, stream=True,
+                                      timeout=(10, 300)) as response:
+                    # Any client error (other than rate limiting) means no stream endpoint
+                    if 400 <= response.status_code < 500 and response.status_code != 429:
+                        unsupported = f"HTTP {response.status_code}"
+                        break
+                    
+                    response.raise_for_status()
+                    
+                    # e.g. an HTML catch-all page from a proxy
+                    content_type = response.headers.get('Content-Type', '')
+                    if 'json' not in content_type:
+                        unsupported = f"returned {content_type or 'no content type'}"
+                        break
+                    
+                    # One NDJSON log event per line
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        
+                        log = json.loads(line)
+                        
+                        # e.g. the usual {"success": false, ...} envelope or a JSON array
+                        if not isinstance(log, dict) or 'type' not in log or 'text' not in log:
+                            unsupported = "sent a non-log event"
+                            break
+                        
+                        # Only a new log counts as the stream making progress
+                        log_id = log.get('uuid')
+                        if log_id and log_id != since_log_id:
+                            since_log_id = log_id
+                            reconnects = 0
+                        
+                        text = log.get('text') or ''
+                        text_lower = text.lower()
+                        
+                        # Check for completion
+                        if log.get('type') == 2 and 'completed' in text_lower:
+                            elapsed = time.time() - start_time
+                            logger.info(f"Agent completed in {elapsed:.0f} seconds")
+                            return True, log.get('output_folder')
+                        
+                        # Show progress updates, keyed on the log's own id
+                        progress_id = log.get('uuid', text)
+                        if 'progress' in text_lower and progress_id != last_progress_id:
+                            logger.info(f"  Progress: {text}")
+                            last_progress_id = progress_id
+                
+                if unsupported:
+                    break
+                
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"Log stream interrupted: {e}")
+            
+            # Stream closed before the terminal event - reconnect
+            time.sleep(self._poll_delay(reconnects))
+            reconnects += 1
+        
+        else:
+            unsupported = f"sent no new logs after {reconnects} reconnects"
+        
+        # Polling runs outside the stream's try block so its errors propagate
+        logger.info(f"Log stream {unsupported} - falling back to polling")
+        self._stream_logs = False
+        return self.poll_job_status(job_id)
     
     def get_job_details(self, job_id: str) -> dict:
         """Get job details including output folder"""
@@ -308,46 +609,173 @@ class Ren3AgentProcessor:
         }
         
         url = f"{self.config.api_url}/tensordrive/get_filestream"
+        part_path = output_path.with_name(output_path.name + '.part')
         
+        self._rate_limiter.acquire()
         try:
             response = self.session.post(url, json=data, timeout=120, stream=True)
             response.raise_for_status()
             
-            # Save file
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+            # Save to a partial file first so an interrupted download is never
+            # mistaken for a finished one on resume
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
                     f.write(chunk)
+            os.replace(part_path, output_path)
             
             logger.info(f"Downloaded {output_path.name}")
             return output_path
             
         except Exception as e:
             logger.error(f"Failed to download CSV: {e}")
+            part_path.unlink(missing_ok=True)
             raise
     
+    def _download_result(self, doc_uuid: str, output_path: Path) -> Optional[Path]:
+        """Download a result CSV, returning None instead of raising on failure"""
+        try:
+            return self.download_csv(doc_uuid, output_path)
+        except Exception:
+            # Already logged by download_csv - skip this file
+            return None
+    
     def combine_csvs(self, csv_files: List[Path], output_path: Path) -> Path:
         """Combine multiple CSV files into one Excel file"""
         logger.info(f"Combining {len(csv_files)} CSV files...")
         
-        combined_df = pd.DataFrame()
+        if pl is not None:
+            return self._combine_csvs_polars(csv_files, output_path)
+        
+        tables = []
         
         for csv_file in csv_files:
             try:
-                df = pd.read_csv(csv_file)
-                combined_df = pd.concat([combined_df, df], ignore_index=True)
-                logger.info(f"  Added {len(df)} rows from {csv_file.name}")
+                table = pv.read_csv(csv_file)
+                tables.append(table)
+                logger.info(f"  Added {table.num_rows} rows from {csv_file.name}")
             except Exception as e:
                 logger.error(f"  Failed to read {csv_file.name}: {e}")
         
+        # Concatenate once
+        try:
+            combined = pa.concat_tables(tables, promote_options='permissive') if tables else pa.table({})
+        except pa.ArrowException as e:
+            # Batches inferred incompatible types for a column - fall back to text
+            logger.warning(f"  Column types differ between files ({e}) - combining as text")
+            tables = [table.cast(pa.schema([(f.name, pa.string()) for f in table.schema]))
+                      for table in tables]
+            combined = pa.concat_tables(tables, promote_options='default')
+        
         # Save as Excel
-        combined_df.to_excel(output_path, index=False, engine='openpyxl')
+        self._strip_timezones(combined).to_pandas().to_excel(output_path, index=False,
+                                                             engine='xlsxwriter')
         logger.info(f"Combined Excel saved: {output_path}")
-        logger.info(f"  Total rows: {len(combined_df)}")
+        logger.info(f"  Total rows: {combined.num_rows}")
         
         return output_path
     
-    def process_promo_folder(self, promo_folder_path: str) -> Optional[Path]:
-        """Main processing pipeline - ONE FILE AT A TIME"""
+    def _strip_timezones(self, table: pa.Table) -> pa.Table:
+        """Drop timezones from timestamp columns, which Excel cannot store"""
+        fields = [
+            pa.field(f.name, pa.timestamp(f.type.unit))
+            if pa.types.is_timestamp(f.type) and f.type.tz else f
+            for f in table.schema
+        ]
+        return table.cast(pa.schema(fields))
+    
+    def _combine_csvs_polars(self, csv_files: List[Path], output_path: Path) -> Path:
+        """Combine CSV files using polars' multi-threaded reader"""
+        frames = []
+        
+        for csv_file in csv_files:
+            try:
+                # Infer types from the whole file, not just the first 100 rows, and
+                # parse ISO dates/timestamps as pyarrow does in the fallback path
+                df = pl.read_csv(csv_file, infer_schema_length=None, try_parse_dates=True)
+                frames.append(df)
+                logger.info(f"  Added {df.height} rows from {csv_file.name}")
+            except Exception as e:
+                logger.error(f"  Failed to read {csv_file.name}: {e}")
+        
+        # Diagonal concat tolerates missing columns and differing types between batches
+        combined = pl.concat(frames, how='diagonal_relaxed') if frames else pl.DataFrame()
+        
+        # Excel cannot store timezones - keep UTC wall time, like _strip_timezones
+        combined = combined.with_columns(
+            pl.col(name).dt.replace_time_zone(None)
+            for name, dtype in combined.schema.items()
+            if isinstance(dtype, pl.Datetime) and dtype.time_zone
+        )
+        
+        # Save as Excel - plain sheet with naive datetimes, matching the pyarrow path
+        combined.to_pandas().to_excel(output_path, index=False, engine='xlsxwriter')
+        logger.info(f"Combined Excel saved: {output_path}")
+        logger.info(f"  Total rows: {combined.height}")
+        
+        return output_path
+    
+    def _process_file(self, file_num: int, json_file: Path, total: int,
+                      processed_dir: Path) -> Optional[Tuple[str, Path]]:
+        """Run a single JSON file through the agent and locate its result CSV"""
+        # Files may run concurrently, so tag every line with the file it belongs to
+        log = PrefixLogAdapter(logger, {'prefix': f"FILE {file_num}/{total}"})
+        log.info(f"Processing: {json_file.name}")
+        
+        try:
+            # Generate temp folder UUID
+            temp_folder_uuid = str(uuid.uuid4())
+            log.info(f"Temp folder: {temp_folder_uuid}")
+            
+            # Upload single file
+            upload_response = self.upload_files([json_file], temp_folder_uuid)
+            
+            # Wait for ingestion and verify upload
+            input_files = self._wait_for_ingestion(temp_folder_uuid, 1)
+            
+            # Run agent
+            job_id = self.run_agent(input_files, temp_folder_uuid)
+            
+            # Wait for completion
+            _, output_folder = self.poll_job_status_stream(job_id)
+            
+            # Get output folder, unless the completion log already carried it
+            if output_folder:
+                log.info(f"Output folder: {output_folder}")
+            else:
+                job_details = self.get_job_details(job_id)
+                output_folder = job_details['agentJob']['output_folder']
+            
+            # Get output files
+            output_files = self.get_output_files(output_folder)
+            
+            # Find the CSV file
+            by_name = {file['doc_filename']: file for file in output_files}
+            csv_file = by_name.get(self.config.result_csv_name)
+            
+            if not csv_file:
+                log.warning(f"CSV file not found in output for {json_file.name}")
+                return None
+            
+            # CSV is downloaded by the caller as soon as this returns
+            csv_path = self._result_csv_path(processed_dir, file_num, json_file)
+            
+            log.info(f"✓ File {file_num} completed successfully")
+            return csv_file['uuid'], csv_path
+            
+        except Exception as e:
+            log.error(f"✗ File {file_num} failed: {e}")
+            # Continue to next file even if this one fails
+            return None
+    
+    def _result_csv_path(self, processed_dir: Path, file_num: int, json_file: Path) -> Path:
+        """Where the result CSV for a given input file is saved"""
+        return processed_dir / f"file_{file_num:03d}_{json_file.stem}.csv"
+    
+    def process_promo_folder(self, promo_folder_path: str, force: bool = False) -> Optional[Path]:
+        """Main processing pipeline - ONE FILE PER RUN, max_parallel_files at a time
+
+        CSVs left by an earlier interrupted run are reused unless force is set.
+        """
         promo_folder = Path(promo_folder_path)
         
         if not promo_folder.exists():
@@ -373,75 +801,43 @@ class Ren3AgentProcessor:
                 return None
             
             logger.info(f"Total files to process: {len(json_files)}")
-            logger.info(f"Processing ONE file at a time with 20 second delays")
-            
-            # Process each file individually
-            csv_files = []
+            logger.info(f"Processing ONE file per run, {self.config.max_parallel_files} at a time")
             
+            # Skip files whose CSV was already downloaded by a previous run
+            existing = []
+            pending = []
             for file_num, json_file in enumerate(json_files, 1):
-                logger.info(f"\n{'=' * 60}")
-                logger.info(f"FILE {file_num}/{len(json_files)}")
-                logger.info(f"{'=' * 60}")
-                logger.info(f"Processing: {json_file.name}")
-                
-                try:
-                    # Generate temp folder UUID
-                    temp_folder_uuid = str(uuid.uuid4())
-                    logger.info(f"Temp folder: {temp_folder_uuid}")
-                    
-                    # Upload single file
-                    upload_response = self.upload_files([json_file], temp_folder_uuid)
-                    
-                    # Wait a bit for ingestion
-                    logger.info("Waiting for file ingestion...")
-                    time.sleep(5)
-                    
-                    # Verify upload
-                    input_files = self.get_job_input_files(temp_folder_uuid)
-                    
-                    # Run agent
-                    job_id = self.run_agent(input_files, temp_folder_uuid)
-                    
-                    # Poll for completion
-                    self.poll_job_status(job_id)
-                    
-                    # Get output folder
-                    job_details = self.get_job_details(job_id)
-                    output_folder = job_details['agentJob']['output_folder']
-                    
-                    # Get output files
-                    output_files = self.get_output_files(output_folder)
-                    
-                    # Find the CSV file
-                    csv_file = None
-                    for file in output_files:
-                        if file['doc_filename'] == 'competitive_analysis_results.csv':
-                            csv_file = file
-                            break
-                    
-                    if not csv_file:
-                        logger.warning(f"CSV file not found in output for {json_file.name}")
-                        continue
-                    
-                    # Download CSV
-                    csv_path = processed_dir / f"file_{file_num:03d}_{json_file.stem}.csv"
-                    self.download_csv(csv_file['uuid'], csv_path)
-                    csv_files.append(csv_path)
-                    
-                    logger.info(f"✓ File {file_num} completed successfully")
-                    
-                    # Pause 20 seconds before next file (except for last file)
-                    if file_num < len(json_files):
-                        logger.info(" Pausing 20 seconds before next file...")
-                        time.sleep(20)
+                csv_path = self._result_csv_path(processed_dir, file_num, json_file)
+                if not force and csv_path.exists() and csv_path.stat().st_size > 0:
+                    logger.info(f"Skipping {json_file.name} - already processed: {csv_path.name}")
+                    existing.append(csv_path)
+                else:
+                    pending.append((file_num, json_file))
+            
+            # Process each file individually, up to max_parallel_files concurrently.
+            # Each result CSV is downloaded as soon as its file finishes, so
+            # completed work is on disk even if the run is interrupted.
+            downloads = []
+            with ThreadPoolExecutor(max_workers=8) as download_executor:
+                if pending:
+                    workers = min(self.config.max_parallel_files, len(pending))
                     
-                except Exception as e:
-                    logger.error(f"✗ File {file_num} failed: {e}")
-                    # Continue to next file even if this one fails
-                    if file_num < len(json_files):
-                        logger.info("Pausing 20 seconds before next file...")
-                        time.sleep(20)
-                    continue
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        futures = [
+                            executor.submit(self._process_file, file_num, json_file,
+                                            len(json_files), processed_dir)
+                            for file_num, json_file in pending
+                        ]
+                        for future in as_completed(futures):
+                            result = future.result()
+                            if result:
+                                downloads.append(
+                                    download_executor.submit(self._download_result, *result))
+            
+            csv_files = existing + [f.result() for f in downloads if f.result()]
+            
+            # Keep original file order regardless of completion order
+            csv_files.sort()
             
             # Combine all CSVs
             if csv_files:
@@ -470,12 +866,16 @@ class Ren3AgentProcessor:
 
 def main():
     """Main entry point"""
-    if len(sys.argv) < 2:
-        print("Usage: python ren3_processor.py <promo_folder_path>")
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    force = '--force' in sys.argv[1:]
+    
+    if not args:
+        print("Usage: python ren3_processor.py <promo_folder_path> [--force]")
         print("Example: python ren3_processor.py output/promo_20251020_080000")
+        print("  --force  Reprocess files even if their CSV already exists")
         sys.exit(1)
     
-    promo_folder = sys.argv[1]
+    promo_folder = args[0]
     
     try:
         # Load configuration
@@ -485,7 +885,7 @@ def main():
         processor = Ren3AgentProcessor(config)
         
         # Process folder
-        result = processor.process_promo_folder(promo_folder)
+        result = processor.process_promo_folder(promo_folder, force=force)
         
         if result:
             print(f"\nSUCCESS! Final output: {result}")
@@ -22,16 +22,14 @@ def get_latest_promo_folder():
     """Get the most recent promo folder"""
     output_dir = Path('/app/output')
     
-    promo_folders = list(output_dir.glob('promo_*'))
+    # Folder names embed a promo_YYYYMMDD_HHMMSS timestamp, so the
+    # lexicographically greatest name is the most recent - no stat needed
+    latest = max(output_dir.glob('promo_*'), key=lambda x: x.name, default=None)
     
-    if not promo_folders:
+    if not latest:
         logger.warning("No promo folders found")
         return None
     
-    # Sort by modification time (most recent first)
-    promo_folders.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-    
-    latest = promo_folders[0]
     logger.info(f"Found latest promo folder: {latest.name}")
     
     return latest
@@ -57,6 +55,9 @@ def main():
     logger.info("=" * 60)
     logger.info(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
+    # --force reprocesses everything, ignoring earlier results
+    force = '--force' in sys.argv[1:]
+    
     # Get latest folder
     promo_folder = get_latest_promo_folder()
     
@@ -65,7 +66,7 @@ def main():
         sys.exit(1)
     
     # Check if already processed
-    if check_if_already_processed(promo_folder):
+    if not force and check_if_already_processed(promo_folder):
         logger.info("Folder already processed. Skipping.")
         sys.exit(0)
     
@@ -78,7 +79,7 @@ def main():
         config = Ren3Config()
         processor = Ren3AgentProcessor(config)
         
-        result = processor.process_promo_folder(str(promo_folder))
+        result = processor.process_promo_folder(str(promo_folder), force=force)
         
         if result:
             logger.info("=" * 60)